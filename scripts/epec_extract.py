@@ -8,16 +8,24 @@ outputs are saved under data/.
 from __future__ import annotations
 
 import argparse
+import atexit
 import csv
-import json
 import sys
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import product
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import Iterable, List, Mapping, NamedTuple, Sequence, Tuple
 
-import requests
-from bs4 import BeautifulSoup
+import lxml.html
+import orjson
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util.retry import Retry
 
 BASE_URL = "https://data.eib.org"
 PORTAL_URL = f"{BASE_URL}/epec/"
@@ -28,6 +36,66 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_OUTPUT_DIR = REPO_ROOT / "data"
 DEFAULT_OUTPUT_CSV = DEFAULT_OUTPUT_DIR / "epec_country_sector_year.csv"
 DEFAULT_METADATA_JSON = DEFAULT_OUTPUT_DIR / "epec_country_sector_year.metadata.json"
+DEFAULT_CONCURRENCY = 16
+FILTERS_CACHE_TTL = timedelta(hours=24)
+HTTP_CACHE_NAME = ".http_cache.sqlite"
+HTTP_CACHE_TTL = timedelta(days=1)
+
+# Transient 429/5xx responses and dropped connections are retried with
+# exponential backoff rather than aborting the whole extract.
+HTTP_RETRY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET"]),
+    respect_retry_after_header=True,
+)
+
+# Every request targets the same host, so share one pooled session and let
+# keep-alive reuse the TCP/TLS connection instead of reconnecting per call.
+# It is installed by open_session() so that importing the module touches no files.
+SESSION: CachedSession | None = None
+RESPONSE_COUNTS = {"total": 0, "from_cache": 0}
+_RESPONSE_COUNTS_LOCK = threading.Lock()
+
+
+def open_session(cache_path: Path, pool_size: int) -> CachedSession:
+    """Install the shared session, caching responses in ``cache_path`` for reruns within the TTL."""
+    global SESSION
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    session = CachedSession(
+        str(cache_path),
+        backend="sqlite",
+        expire_after=HTTP_CACHE_TTL,
+        allowable_methods=("GET",),
+    )
+    session.headers.update(
+        {
+            "Accept": "application/json",
+            "Connection": "keep-alive",
+            "User-Agent": "epec-extract/1.0",
+        }
+    )
+    # One keep-alive slot per worker thread.
+    session.mount(
+        "https://",
+        HTTPAdapter(pool_connections=16, pool_maxsize=pool_size, max_retries=HTTP_RETRY),
+    )
+    atexit.register(session.close)
+    SESSION = session
+    return session
+
+
+def http_get(url: str, **kwargs) -> Response:
+    """GET through the shared session, tallying how many responses came from the cache."""
+    if SESSION is None:
+        raise RuntimeError("open_session() must be called before fetching.")
+    resp = SESSION.get(url, timeout=60, **kwargs)
+    resp.raise_for_status()
+    with _RESPONSE_COUNTS_LOCK:
+        RESPONSE_COUNTS["total"] += 1
+        RESPONSE_COUNTS["from_cache"] += bool(getattr(resp, "from_cache", False))
+    return resp
 
 
 @dataclass(frozen=True)
@@ -36,44 +104,59 @@ class Filters:
     countries: Sequence[str]
     min_year: int
     max_year: int
+    # Derived once at construction so the request grid only does lookups.
+    sector_codes: Mapping[str, str] = field(init=False, repr=False, compare=False)
+    country_codes: Mapping[str, str] = field(init=False, repr=False, compare=False)
+    year_range: Tuple[int, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "sector_codes", {sector: encode_filter(sector) for sector in self.sectors})
+        object.__setattr__(self, "country_codes", {country: encode_filter(country) for country in self.countries})
+        object.__setattr__(self, "year_range", tuple(range(self.min_year, self.max_year + 1)))
+
 
-    @property
-    def year_range(self) -> Sequence[int]:
-        return list(range(self.min_year, self.max_year + 1))
+class Row(NamedTuple):
+    """One CSV record; field order is the output column order."""
 
+    country: str
+    sector: str
+    year: int
+    project_count: int
+    project_value_eur_millions: float
 
+
+@lru_cache(maxsize=1)
 def fetch_portal_html() -> str:
-    resp = requests.get(PORTAL_URL, timeout=60)
-    resp.raise_for_status()
+    resp = http_get(PORTAL_URL, headers={"Accept": "text/html"})
     return resp.text
 
 
+def _option_labels(select: lxml.html.HtmlElement) -> List[str]:
+    """Return the dropdown's option labels, skipping blanks and the "--All--" entry."""
+    labels = []
+    for opt in select.iter("option"):
+        text = opt.text_content().strip()
+        if text and text != "--All--" and opt.get("value", "").lower() != "all":
+            labels.append(text)
+    return labels
+
+
 def extract_filters(html: str) -> Filters:
-    soup = BeautifulSoup(html, "html.parser")
+    tree = lxml.html.fromstring(html)
 
-    slider = soup.find("div", {"id": "yearSlider"})
+    slider = tree.get_element_by_id("yearSlider", None)
     if slider is None:
         raise RuntimeError("Year slider not found in the EPEC portal HTML.")
-    min_year = int(slider["data-slider-min"])
-    max_year = int(slider["data-slider-max"])
+    min_year = int(slider.get("data-slider-min"))
+    max_year = int(slider.get("data-slider-max"))
 
-    sector_select = soup.find("select", {"id": "sector"})
-    country_select = soup.find("select", {"id": "country"})
+    sector_select = tree.get_element_by_id("sector", None)
+    country_select = tree.get_element_by_id("country", None)
     if sector_select is None or country_select is None:
         raise RuntimeError("Unable to locate sector or country dropdowns in portal HTML.")
 
-    sectors = [
-        opt.get_text(strip=True)
-        for opt in sector_select.find_all("option")
-        if opt.get_text(strip=True) and "--All--" not in opt.get_text()
-    ]
-    countries = [
-        opt.get_text(strip=True)
-        for opt in country_select.find_all("option")
-        if opt.get_text(strip=True)
-        and "--All--" not in opt.get_text()
-        and opt.get("value", "").lower() != "all"
-    ]
+    sectors = _option_labels(sector_select)
+    countries = _option_labels(country_select)
 
     if not sectors or not countries:
         raise RuntimeError("Parsed empty sector or country list from the portal.")
@@ -81,75 +164,125 @@ def extract_filters(html: str) -> Filters:
     return Filters(sectors=sectors, countries=countries, min_year=min_year, max_year=max_year)
 
 
+def load_filters(cache_path: Path | None = None, refresh: bool = False) -> Filters:
+    """Return portal filters, reusing ``cache_path`` while it is younger than the TTL.
+
+    With ``refresh`` the cached copy is ignored and rewritten from the portal.
+    """
+    if cache_path is not None and cache_path.exists() and not refresh:
+        modified = datetime.fromtimestamp(cache_path.stat().st_mtime, timezone.utc)
+        if datetime.now(timezone.utc) - modified < FILTERS_CACHE_TTL:
+            return Filters(**orjson.loads(cache_path.read_bytes()))
+
+    filters = extract_filters(fetch_portal_html())
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cached = {f.name: getattr(filters, f.name) for f in fields(filters) if f.init}
+        cache_path.write_bytes(orjson.dumps(cached, option=orjson.OPT_INDENT_2))
+    return filters
+
+
 def encode_filter(value: str) -> str:
     """Match the portal encoding by replacing spaces with underscores."""
     return value.replace(" ", "_")
 
 
-def fetch_sector_years(
-    sector: str,
-    country: str,
-    year_span: Tuple[int, int],
-) -> dict:
+def fetch_sector_years(filters: Filters, sector: str, country: str) -> dict:
     params = {
-        "year": f"{year_span[0]},{year_span[1]}",
-        "sector": encode_filter(sector),
-        "country": encode_filter(country),
+        "year": f"{filters.min_year},{filters.max_year}",
+        "sector": filters.sector_codes[sector],
+        "country": filters.country_codes[country],
     }
-    resp = requests.get(SECTOR_YEARS_ENDPOINT, params=params, timeout=60)
-    resp.raise_for_status()
-    payload = resp.json()
+    resp = http_get(SECTOR_YEARS_ENDPOINT, params=params)
+    payload = orjson.loads(resp.content)
     if not isinstance(payload, dict) or "data" not in payload:
         raise RuntimeError(f"Unexpected payload for {sector}/{country}: {payload}")
     return payload
 
 
-def fetch_reference_totals(filters: Filters) -> tuple[int, int]:
+@lru_cache(maxsize=None)
+def fetch_reference_totals(year_span: Tuple[int, int]) -> tuple[int, int]:
     params = [
-        ("year", filters.min_year),
-        ("year", filters.max_year),
+        ("year", year_span[0]),
+        ("year", year_span[1]),
         ("sector", ""),
         ("ccountry", "all"),
     ]
-    resp = requests.get(QUICKSTAT_ENDPOINT, params=params, timeout=60)
-    resp.raise_for_status()
-    payload = resp.json()
+    resp = http_get(QUICKSTAT_ENDPOINT, params=params)
+    payload = orjson.loads(resp.content)
     if not isinstance(payload, list) or len(payload) < 1:
         raise RuntimeError(f"Unexpected quickStat payload: {payload}")
     reference = payload[0]
     return int(reference["total"]), int(reference["totalValue"])
 
 
-def iter_rows(filters: Filters) -> Iterable[dict]:
-    for country in filters.countries:
-        for sector in filters.sectors:
-            payload = fetch_sector_years(sector, country, (filters.min_year, filters.max_year))
+def iter_rows(filters: Filters, concurrency: int = DEFAULT_CONCURRENCY) -> Iterable[Row]:
+    """Fetch every country-sector series concurrently and yield rows in grid order."""
+    pairs = list(product(filters.countries, filters.sectors))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        payloads = executor.map(lambda pair: fetch_sector_years(filters, pair[1], pair[0]), pairs)
+        for (country, sector), payload in zip(pairs, payloads):
             values_by_year = {
                 int(year): (int(total or 0), float(total_value or 0))
                 for year, total, total_value in zip(payload["data"], payload["total"], payload["totalValue"])
             }
             for year in filters.year_range:
                 projects, total_value = values_by_year.get(year, (0, 0.0))
-                yield {
-                    "country": country,
-                    "sector": sector,
-                    "year": year,
-                    "project_count": projects,
-                    "project_value_eur_millions": total_value,
-                }
+                yield Row(country, sector, year, projects, total_value)
 
 
-def write_csv(rows: Sequence[dict], output_path: Path) -> int:
+def write_csv(rows: Iterable[Row], output_path: Path) -> tuple[int, int, float]:
+    """Stream rows to ``output_path`` and return the row count and summed projects/value."""
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    if not rows:
-        raise RuntimeError("No rows returned from the API.")
-
-    fieldnames = list(rows[0].keys())
+    row_count = 0
+    summed_projects = 0
+    summed_value = 0.0
     with output_path.open("w", newline="", encoding="utf-8") as fh:
-        writer = csv.DictWriter(fh, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-    return len(rows)
+        writer = csv.writer(fh)
+        writer.writerow(Row._fields)
+        for row in rows:
+            writer.writerow(row)
+            row_count += 1
+            summed_projects += row.project_count
+            summed_value += row.project_value_eur_millions
+    if not row_count:
+        raise RuntimeError("No rows returned from the API.")
+    return row_count, summed_projects, summed_value
+
+
+def write_parquet(csv_path: Path, output_path: Path) -> bool:
+    """Mirror the CSV as zstd Parquet with dictionary-encoded labels; skipped without pyarrow.
+
+    The source CSV's size and mtime are stored in the file metadata so readers
+    can tell whether the copy still matches the CSV they expect.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+    except ImportError:
+        return False
+
+    label = pa.dictionary(pa.int32(), pa.string())
+    column_types = {
+        "country": label,
+        "sector": label,
+        "year": pa.int16(),
+        "project_count": pa.int32(),
+        "project_value_eur_millions": pa.float64(),
+    }
+    table = pa_csv.read_csv(csv_path, convert_options=pa_csv.ConvertOptions(column_types=column_types))
+    source = csv_path.stat()
+    table = table.replace_schema_metadata(
+        {
+            **(table.schema.metadata or {}),
+            b"epec_source_csv_size": str(source.st_size).encode(),
+            b"epec_source_csv_mtime_ns": str(source.st_mtime_ns).encode(),
+        }
+    )
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, output_path, compression="zstd")
+    return True
 
 
 def write_metadata(
@@ -159,6 +292,7 @@ def write_metadata(
     row_count: int,
     total_projects: int,
     total_value_millions: int,
+    response_counts: Mapping[str, int],
 ) -> None:
     metadata = {
         "source": PORTAL_URL,
@@ -172,9 +306,18 @@ def write_metadata(
         "total_projects": total_projects,
         "total_project_value_eur_millions": total_value_millions,
         "total_project_value_eur_bn": round(total_value_millions / 1000, 1),
+        # downloaded_at_utc is the run time; cached responses may be up to a day older.
+        "http_responses": response_counts["total"],
+        "http_responses_from_cache": response_counts["from_cache"],
     }
-    with metadata_path.open("w", encoding="utf-8") as fh:
-        json.dump(metadata, fh, indent=2)
+    metadata_path.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return number
 
 
 def parse_args(argv: Sequence[str]) -> argparse.Namespace:
@@ -191,27 +334,60 @@ def parse_args(argv: Sequence[str]) -> argparse.Namespace:
         default=DEFAULT_METADATA_JSON,
         help=f"Path to write run metadata (default: {DEFAULT_METADATA_JSON})",
     )
+    parser.add_argument(
+        "--out-parquet",
+        type=Path,
+        default=None,
+        help="Path to write a Parquet copy of the CSV when pyarrow is installed (default: --out-csv with a .parquet suffix)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=positive_int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum number of in-flight API requests (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--filters-cache",
+        type=Path,
+        default=None,
+        help="Optional JSON file caching the parsed portal filters for 24 hours (e.g. data/.filters.json)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=(
+            f"Clear the HTTP response cache ({HTTP_CACHE_NAME} next to the output CSV) and ignore "
+            "--filters-cache, forcing a fresh pull"
+        ),
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: Sequence[str] | None = None) -> None:
     args = parse_args(argv or sys.argv[1:])
-    html = fetch_portal_html()
-    filters = extract_filters(html)
-    rows = list(iter_rows(filters))
-    quickstat_total_projects, quickstat_total_value = fetch_reference_totals(filters)
-    summed_projects = sum(row["project_count"] for row in rows)
-    summed_value = round(sum(row["project_value_eur_millions"] for row in rows))
-    if summed_value != quickstat_total_value:
-        raise RuntimeError(
-            f"Total project value mismatch: summed rows={summed_value} "
-            f"vs quickStat={quickstat_total_value}"
-        )
-    if summed_projects < quickstat_total_projects:
-        raise RuntimeError(
-            f"Total project count {summed_projects} is below quickStat {quickstat_total_projects}"
-        )
-    row_count = write_csv(rows, args.out_csv)
+    session = open_session(args.out_csv.parent / HTTP_CACHE_NAME, args.concurrency)
+    if args.no_cache:
+        session.cache.clear()
+    filters = load_filters(args.filters_cache, refresh=args.no_cache)
+    # Stream into a scratch file so a failed cross-check never replaces the published CSV.
+    partial_csv = args.out_csv.with_name(f"{args.out_csv.name}.partial")
+    try:
+        row_count, summed_projects, summed_value_raw = write_csv(iter_rows(filters, args.concurrency), partial_csv)
+        quickstat_total_projects, quickstat_total_value = fetch_reference_totals((filters.min_year, filters.max_year))
+        summed_value = round(summed_value_raw)
+        if summed_value != quickstat_total_value:
+            raise RuntimeError(
+                f"Total project value mismatch: summed rows={summed_value} "
+                f"vs quickStat={quickstat_total_value}"
+            )
+        if summed_projects < quickstat_total_projects:
+            raise RuntimeError(
+                f"Total project count {summed_projects} is below quickStat {quickstat_total_projects}"
+            )
+    except BaseException:
+        partial_csv.unlink(missing_ok=True)
+        raise
+    partial_csv.replace(args.out_csv)
     write_metadata(
         filters,
         args.out_csv,
@@ -219,8 +395,12 @@ def main(argv: Sequence[str] | None = None) -> None:
         row_count,
         summed_projects,
         summed_value,
+        RESPONSE_COUNTS,
     )
     print(f"Wrote {row_count} rows to {args.out_csv}")
+    out_parquet = args.out_parquet or args.out_csv.with_suffix(".parquet")
+    if write_parquet(args.out_csv, out_parquet):
+        print(f"Wrote {out_parquet}")
 
 
 if __name__ == "__main__":
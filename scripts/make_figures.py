@@ -1,26 +1,63 @@
 """Generate exploratory figures for the EPEC dataset."""
 from __future__ import annotations
 
+from importlib.util import find_spec
 from pathlib import Path
 
+import matplotlib
+
+matplotlib.use("Agg")  # headless: skip interactive backend probing
+
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
 
 DATA_PATH = Path("data/epec_country_sector_year.csv")
+PARQUET_PATH = Path("data/epec_country_sector_year.parquet")
 FIG_DIR = Path("figures")
+CSV_DTYPES = {
+    "country": "category",
+    "sector": "category",
+    "year": "int16",
+    "project_count": "int32",
+    "project_value_eur_millions": "float32",
+}
 FIG_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def main() -> None:
-    df = pd.read_csv(DATA_PATH)
+def parquet_matches_csv() -> bool:
+    """Whether PARQUET_PATH was written from the current DATA_PATH (per its stored source stats)."""
+    import pyarrow.parquet as pq
+
+    if not PARQUET_PATH.exists():
+        return False
+    metadata = pq.read_schema(PARQUET_PATH).metadata or {}
+    source = DATA_PATH.stat()
+    return (
+        metadata.get(b"epec_source_csv_size") == str(source.st_size).encode()
+        and metadata.get(b"epec_source_csv_mtime_ns") == str(source.st_mtime_ns).encode()
+    )
+
 
-    yearly = (
-        df.groupby("year", as_index=False)
-        .agg(projects=("project_count", "sum"), value_eur_m=("project_value_eur_millions", "sum"))
-        .sort_values("year")
+def load_data() -> pd.DataFrame:
+    """Read the extract, preferring its Parquet copy and pyarrow when they are available."""
+    if find_spec("pyarrow") is None:
+        return pd.read_csv(DATA_PATH, dtype=CSV_DTYPES)
+    if parquet_matches_csv():
+        return pd.read_parquet(PARQUET_PATH).astype(CSV_DTYPES)
+    return pd.read_csv(DATA_PATH, engine="pyarrow", dtype=CSV_DTYPES)
+
+
+def main() -> None:
+    df = load_data()
+    # The extract has exactly one row per year/sector/country, so index it once and
+    # roll each chart's totals up from the levels instead of regrouping the frame.
+    cube = df.set_index(["year", "sector", "country"])[["project_count", "project_value_eur_millions"]].rename(
+        columns={"project_count": "projects", "project_value_eur_millions": "value_eur_m"}
     )
 
+    yearly = cube.groupby(level="year").sum().reset_index()
+
     sns.set_theme(style="whitegrid")
     fig, ax1 = plt.subplots(figsize=(10, 5))
     ax2 = ax1.twinx()
@@ -32,38 +69,42 @@ def main() -> None:
     fig.tight_layout()
     fig.legend(loc="upper left", bbox_to_anchor=(0.1, 0.9))
     fig.savefig(FIG_DIR / "projects_value_over_time.png", dpi=200)
-    plt.close(fig)
+    fig.clf()
 
     sector_value = (
-        df.groupby("sector", as_index=False)
-        .agg(projects=("project_count", "sum"), value_eur_m=("project_value_eur_millions", "sum"))
+        cube.groupby(level="sector", observed=True)
+        .sum()
         .sort_values("value_eur_m", ascending=False)
+        .reset_index()
+        .astype({"sector": str})
     )
 
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig.set_size_inches(10, 6)
+    ax = fig.add_subplot()
     sns.barplot(data=sector_value, y="sector", x="value_eur_m", ax=ax, palette="viridis")
     ax.set_xlabel("Total value (EUR millions)")
     ax.set_ylabel("Sector")
     ax.set_title("Total PPP value by sector (1990-2021)")
     fig.tight_layout()
-    fig.savefig(FIG_DIR / "value_by_sector.png", dpi=200)
-    plt.close(fig)
+    fig.savefig(FIG_DIR / "value_by_sector.png", dpi=150)
+    fig.clf()
 
     country_projects = (
-        df.groupby("country", as_index=False)
-        .agg(projects=("project_count", "sum"))
-        .sort_values("projects", ascending=False)
-        .head(10)
+        cube.groupby(level="country", observed=True)["projects"]
+        .sum()
+        .nlargest(10)
+        .reset_index()
+        .astype({"country": str})
     )
 
-    fig, ax = plt.subplots(figsize=(10, 6))
+    ax = fig.add_subplot()
     sns.barplot(data=country_projects, x="country", y="projects", ax=ax, palette="crest")
     ax.set_ylabel("Projects closed")
     ax.set_xlabel("Country")
     ax.set_title("Top 10 countries by PPP project count (1990-2021)")
-    plt.xticks(rotation=45, ha="right")
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
     fig.tight_layout()
-    fig.savefig(FIG_DIR / "projects_by_country.png", dpi=200)
+    fig.savefig(FIG_DIR / "projects_by_country.png", dpi=150)
     plt.close(fig)
 
 